@@ -1,7 +1,14 @@
+import os
+
+import numpy as np
 import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
+from tsdownsample import LTTBDownsampler
 
 # Set page config
 st.set_page_config(
@@ -10,24 +17,343 @@ st.set_page_config(
     layout="wide"
 )
 
+# Source data; a Parquet copy is written next to the CSV on first load
+DATA_FILE = 'clustered_firms_clean.csv'
+PARQUET_FILE = 'clustered_firms_clean.parquet'
+# Parquet metadata key holding the signature of the CSV the copy was built from
+PARQUET_SOURCE_KEY = b'source_csv'
+
+# Upper bound on the points sent to the browser for each line chart series
+MAX_POINTS_PER_SERIES = 500
+
+# Percentages stay numeric (scaled by 100) and are formatted by the dataframe widget
+PERCENT_COLUMN = st.column_config.NumberColumn(format="%.2f%%")
+TABLE_PERCENT_COLS = ['ROA', 'ROE', 'Net_Margin']
+
+# Company View key metrics: (label, column, format)
+KEY_METRICS = [
+    ("ROA", 'ROA', "{:.2%}"),
+    ("ROE", 'ROE', "{:.2%}"),
+    ("Gross Margin", 'Gross_Margin', "{:.2%}"),
+    ("Net Margin", 'Net_Margin', "{:.2%}"),
+    ("EBITDA Margin", 'EBITDA_Margin', "{:.2%}"),
+    ("Asset Turnover", 'Asset_Turnover', "{:.2f}"),
+    ("Debt/Equity", 'Debt_to_Equity', "{:.2f}"),
+    ("Current Ratio", 'Current_Ratio', "{:.2f}")
+]
+
 st.title("📊 Financial Performance Dashboard")
 st.write("Analysis of Clustered Firms")
 
-# Load the data
-@st.cache_data
-def load_data():
+# Identifies the exact CSV a Parquet copy was built from
+def get_source_signature():
+    stat = os.stat(DATA_FILE)
+    return f"{stat.st_mtime_ns}:{stat.st_size}".encode()
+
+# Read the Parquet copy when it was built from the current CSV, otherwise parse the CSV and refresh it
+def read_source_data():
+    signature = get_source_signature()
+    try:
+        metadata = pq.read_schema(PARQUET_FILE).metadata or {}
+        if metadata.get(PARQUET_SOURCE_KEY) == signature:
+            return pd.read_parquet(PARQUET_FILE, engine='pyarrow')
+    except (OSError, pa.ArrowException):
+        pass  # Missing or unreadable copy, rebuild it from the CSV
+    
+    df = pd.read_csv(DATA_FILE)
+    # Parse date
+    if 'Year' in df.columns:
+        df['Year'] = pd.to_datetime(df['Year'], format='%Y-%m-%d')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, PARQUET_SOURCE_KEY: signature})
+    # Write to a temp file and swap it in, so an interrupted write never leaves a partial copy
+    tmp_file = f"{PARQUET_FILE}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(table, tmp_file, compression='zstd')
+        os.replace(tmp_file, PARQUET_FILE)
+    except OSError:
+        # Read-only filesystem, keep reading the CSV
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return df
+
+# Cache key for everything derived from the data; changes whenever the CSV does
+def get_data_version():
+    return str(os.path.getmtime(DATA_FILE)) if os.path.exists(DATA_FILE) else ''
+
+# Load the data once and share the frame, so cached helpers only hash data_version
+@st.cache_resource(max_entries=1)
+def load_data(data_version):
     try:
-        df = pd.read_csv('clustered_firms_clean.csv')
-        # Parse date
+        df = read_source_data()
         if 'Year' in df.columns:
-            df['Year'] = pd.to_datetime(df['Year'], format='%Y-%m-%d')
-            df['Year_Display'] = df['Year'].dt.strftime('%Y')
+            # Keep each company's rows in chronological order
+            df = df.sort_values(['Ticker', 'Year'], ignore_index=True)
+            # Integer year field as the label; no strftime needed
+            df['Year_Display'] = df['Year'].dt.year.astype('int16').astype(str)
+        # Low-cardinality labels as categoricals: sorted categories, integer-code groupbys
+        for col in ('Ticker', 'Name', 'Sector', 'Industry', 'Cluster'):
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        # Ratios don't need double precision
+        float_cols = df.select_dtypes('float64').columns
+        df[float_cols] = df[float_cols].astype('float32')
         return df
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         return None
 
-df = load_data()
+# Polars copy of the data for the group-by aggregations
+@st.cache_resource(max_entries=1)
+def load_pl_data(data_version):
+    df = load_data(data_version)
+    if df is None:
+        return None
+    # Polars only accepts string categoricals, so Cluster goes over as plain integers
+    return pl.from_pandas(df.assign(Cluster=df['Cluster'].astype(df['Cluster'].cat.categories.dtype)))
+
+# Reduce each series to at most n_out points with LTTB, keeping the line shape
+def downsample_series(data, group_col, x_col, y_col, n_out=MAX_POINTS_PER_SERIES):
+    parts = []
+    for _, group in data.groupby(group_col, observed=True, sort=False):
+        if len(group) > n_out:
+            group = group.sort_values(x_col)
+            indices = LTTBDownsampler().downsample(
+                group[x_col].to_numpy().astype('int64'),
+                group[y_col].to_numpy(),
+                n_out=n_out
+            )
+            group = group.iloc[indices]
+        parts.append(group)
+    return pd.concat(parts) if parts else data
+
+# Sidebar option lists, computed once per data load
+@st.cache_data
+def get_filter_options(data_version):
+    df = load_data(data_version)
+    # Company display names: "Ticker - Company Name", built from the unique pairs only
+    pairs = df[['Ticker', 'Name']].drop_duplicates().to_numpy()
+    ticker_by_display = {f"{ticker} - {name}": ticker for ticker, name in pairs}
+    company_options = sorted(ticker_by_display)
+    sectors = df['Sector'].cat.categories.tolist()
+    clusters = df['Cluster'].cat.categories.tolist()
+    return company_options, ticker_by_display, sectors, clusters
+
+# Row positions for every value of a filter column
+@st.cache_data
+def build_row_index(data_version, column):
+    return load_data(data_version).groupby(column, observed=True).indices
+
+# Filtered views, keyed on the sidebar selections
+@st.cache_data
+def get_filtered_data(data_version, column, value):
+    return load_data(data_version).iloc[build_row_index(data_version, column)[value]]
+
+# Sector/cluster overview stats for every group in one Polars group-by
+@st.cache_data
+def compute_group_overview(data_version, column):
+    pl_df = load_pl_data(data_version)
+    aggs = [
+        pl.col('Ticker').n_unique().alias('Companies'),
+        pl.len().alias('Records'),
+        (pl.col('ROA').mean() if 'ROA' in pl_df.columns else pl.lit(0)).alias('Avg ROA')
+    ]
+    if column != 'Sector':
+        aggs.append(pl.col('Sector').n_unique().alias('Sectors'))
+    overview = pl_df.group_by(column).agg(aggs)
+    return {row[column]: row for row in overview.to_dicts()}
+
+# Latest (most recent year) row of every company as a plain dict
+@st.cache_data
+def build_latest_by_ticker(data_version):
+    df = load_data(data_version)
+    # Order rows by (ticker code, year); the last row of each code run is the latest
+    codes = df['Ticker'].cat.codes.to_numpy()
+    order = np.lexsort((df['Year'].to_numpy().astype('int64'), codes))
+    latest_rows = order[np.flatnonzero(np.diff(codes[order], append=-1))]
+    return df.iloc[latest_rows].set_index('Ticker').to_dict('index')
+
+@st.cache_data
+def get_latest_metrics(data_version, ticker):
+    return build_latest_by_ticker(data_version)[ticker]
+
+# Top n companies by ROA in one sector/cluster, gathering only the shown columns
+@st.cache_data
+def get_top_companies_by_roa(data_version, filter_col, filter_val, display_cols, n=10):
+    pl_df = load_pl_data(data_version)
+    rows = build_row_index(data_version, filter_col)[filter_val]
+    top_companies = pl_df.select(
+        [col for col in display_cols if col in pl_df.columns]
+    )[rows].top_k(n, by='ROA').sort('ROA', descending=True)
+    return top_companies.with_columns(
+        [pl.col(col) * 100 for col in TABLE_PERCENT_COLS if col in top_companies.columns]
+    ).to_pandas()
+
+# Aggregations for the Visual Analysis tab
+# All four are planned together and executed in one parallel Polars run
+@st.cache_data
+def compute_visual_aggregates(data_version):
+    lf = load_pl_data(data_version).lazy()
+    cluster_counts, cluster_stats, sector_roa, sector_counts = pl.collect_all([
+        lf.group_by('Cluster').agg(
+            pl.len().alias('Company Count')
+        ).sort(['Company Count', 'Cluster'], descending=[True, False]),
+        lf.group_by('Cluster').agg([
+            # Scaled to percentages for the summary table
+            (pl.col('ROA').mean().round(4) * 100).alias('Avg ROA'),
+            (pl.col('ROE').mean().round(4) * 100).alias('Avg ROE'),
+            pl.col('Ticker').n_unique().alias('Companies')
+        ]).sort('Cluster'),
+        lf.group_by('Sector').agg(
+            pl.col('ROA').mean()
+        ).sort('ROA', nulls_last=True),
+        lf.group_by('Sector').agg(
+            pl.len().alias('Company Count')
+        ).sort(['Company Count', 'Sector'], descending=[True, False]).head(8)  # Top 8 sectors
+    ])
+    return {
+        'cluster_counts': cluster_counts.to_pandas(),
+        'cluster_stats': cluster_stats.to_pandas(),
+        'sector_roa': sector_roa.to_pandas(),
+        'sector_counts': sector_counts.to_pandas()
+    }
+
+@st.cache_data
+def compute_top_companies(data_version, n=5):
+    # Rows are chronological, so last() picks the latest sector and cluster
+    # Companies without any ROA are left out of the ranking, as nlargest did
+    return load_pl_data(data_version).lazy().group_by(['Ticker', 'Name']).agg([
+        pl.col('ROA').mean(),
+        pl.col('Sector').last(),
+        pl.col('Cluster').last()
+    ]).drop_nulls('ROA').sort(
+        ['ROA', 'Ticker', 'Name'], descending=[True, False, False]
+    ).head(n).collect().to_pandas()
+
+@st.cache_data
+def compute_top_companies_table(data_version, n=5):
+    top_companies = compute_top_companies(data_version, n)
+    top_companies_display = top_companies[['Ticker', 'Name', 'Sector', 'Cluster']].assign(
+        ROA=top_companies['ROA'] * 100
+    )
+    top_companies_display.columns = ['Ticker', 'Company Name', 'Sector', 'Cluster', 'Average ROA']
+    return top_companies_display
+
+@st.cache_data
+def get_top_data(data_version, n=5):
+    # Historical data for the top companies
+    top_tickers = compute_top_companies(data_version, n)['Ticker'].tolist()
+    ticker_idx = build_row_index(data_version, 'Ticker')
+    rows = np.concatenate([ticker_idx[ticker] for ticker in top_tickers]) if top_tickers else []
+    return load_data(data_version).iloc[rows]
+
+# Chart figures only depend on the static data, so build them once
+@st.cache_resource
+def build_cluster_donut(data_version):
+    cluster_counts = compute_visual_aggregates(data_version)['cluster_counts']
+    fig = go.Figure(data=[go.Pie(
+        labels=cluster_counts['Cluster'],
+        values=cluster_counts['Company Count'],
+        hole=0.4,
+        marker=dict(colors=px.colors.qualitative.Set3),
+        textinfo='label+percent',
+        hoverinfo='label+value+percent'
+    )])
+    
+    fig.update_layout(
+        title_text="Company Distribution by Cluster",
+        title_font_size=16,
+        showlegend=True,
+        height=400
+    )
+    return fig
+
+@st.cache_resource
+def build_sector_roa_bar(data_version):
+    sector_roa = compute_visual_aggregates(data_version)['sector_roa']
+    roa = sector_roa['ROA'].to_numpy()
+    fig = go.Figure(go.Bar(
+        x=roa,
+        y=sector_roa['Sector'].to_numpy(),
+        orientation='h',
+        marker=dict(color=roa, colorscale='Blues', showscale=True, colorbar=dict(title='ROA')),
+        texttemplate='%{x:.2%}',
+        hovertemplate='Sector=%{y}<br>ROA=%{x}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title_text='Average ROA by Sector',
+        height=400,
+        xaxis_title="Average ROA",
+        yaxis_title="Sector",
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return fig
+
+@st.cache_resource
+def build_sector_count_bar(data_version):
+    sector_counts = compute_visual_aggregates(data_version)['sector_counts']
+    counts = sector_counts['Company Count'].to_numpy()
+    fig = go.Figure(go.Bar(
+        x=sector_counts['Sector'].to_numpy(),
+        y=counts,
+        marker=dict(color=counts, colorscale='Viridis', showscale=True, colorbar=dict(title='Company Count')),
+        texttemplate='%{y}',
+        hovertemplate='Sector=%{x}<br>Company Count=%{y}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title_text='Number of Companies per Sector',
+        height=400,
+        xaxis_title="Sector",
+        yaxis_title="Number of Companies",
+        xaxis_tickangle=45
+    )
+    return fig
+
+@st.cache_resource
+def build_top_roa_line(data_version, n=5):
+    top_data = downsample_series(get_top_data(data_version, n), 'Ticker', 'Year', 'ROA')
+    fig = go.Figure()
+    for name, company_data in top_data.groupby('Name', observed=True, sort=False):
+        fig.add_trace(go.Scattergl(
+            x=company_data['Year_Display'].to_numpy(),
+            y=company_data['ROA'].to_numpy(),
+            mode='lines+markers',
+            name=name
+        ))
+    
+    fig.update_layout(
+        title_text=f'ROA Trend for Top {n} Companies',
+        legend_title_text='Name',
+        height=400,
+        xaxis_title="Year",
+        yaxis_title="ROA",
+        yaxis_tickformat=".0%",
+        hovermode='x unified'
+    )
+    return fig
+
+# The source CSV as-is: original row order and full precision, unlike the
+# sorted, float32 in-memory frame. Read once per data version.
+@st.cache_data
+def get_csv_bytes(data_version):
+    with open(DATA_FILE, 'rb') as f:
+        return f.read()
+
+# The download controls rerun on their own instead of re-running every tab
+@st.fragment
+def render_download(data_version):
+    if st.button("📥 Download Dataset"):
+        st.download_button(
+            label="Click to Download",
+            data=get_csv_bytes(data_version),
+            file_name="financial_data.csv",
+            mime="text/csv"
+        )
+
+data_version = get_data_version()
+df = load_data(data_version)
 
 if df is not None:
     st.success(f"✅ Data loaded successfully: {len(df)} records")
@@ -35,13 +361,8 @@ if df is not None:
     # Sidebar filters
     st.sidebar.header("Filters")
     
-    # Create company display names: "Ticker - Company Name"
-    df['Company_Display'] = df['Ticker'] + ' - ' + df['Name']
-    
     # Get unique values
-    company_options = sorted(df['Company_Display'].unique())
-    sectors = sorted(df['Sector'].unique())
-    clusters = sorted(df['Cluster'].unique())
+    company_options, ticker_by_display, sectors, clusters = get_filter_options(data_version)
     
     # Filters in sidebar
     selected_company_display = st.sidebar.selectbox(
@@ -51,7 +372,7 @@ if df is not None:
     )
     
     # Extract ticker from selection
-    selected_ticker = selected_company_display.split(' - ')[0] if selected_company_display else None
+    selected_ticker = ticker_by_display.get(selected_company_display)
     
     selected_sector = st.sidebar.selectbox(
         "Select Sector:",
@@ -70,11 +391,11 @@ if df is not None:
     with col1:
         st.metric("Total Records", len(df))
     with col2:
-        st.metric("Companies", df['Ticker'].nunique())
+        st.metric("Companies", len(df['Ticker'].cat.categories))
     with col3:
-        st.metric("Sectors", df['Sector'].nunique())
+        st.metric("Sectors", len(sectors))
     with col4:
-        st.metric("Clusters", df['Cluster'].nunique())
+        st.metric("Clusters", len(clusters))
     
     # Tabs
     tab1, tab2, tab3, tab4 = st.tabs(["Company View", "Sector View", "Cluster View", "📈 Visual Analysis"])
@@ -82,109 +403,101 @@ if df is not None:
     with tab1:
         st.header("Company Analysis")
         if selected_ticker:
-            company_data = df[df['Ticker'] == selected_ticker]
+            company_data = get_filtered_data(data_version, 'Ticker', selected_ticker)
             
             if not company_data.empty:
-                company_name = company_data['Name'].iloc[0]
+                # Company info and key metrics all come from the latest year
+                latest = get_latest_metrics(data_version, selected_ticker)
+                company_name = latest['Name']
                 st.subheader(f"{company_name}")
                 
                 # Company info
                 info_col1, info_col2 = st.columns(2)
                 with info_col1:
                     st.write(f"**Ticker:** {selected_ticker}")
-                    st.write(f"**Sector:** {company_data['Sector'].iloc[0]}")
-                    st.write(f"**Industry:** {company_data['Industry'].iloc[0] if 'Industry' in company_data.columns else 'N/A'}")
+                    st.write(f"**Sector:** {latest['Sector']}")
+                    st.write(f"**Industry:** {latest.get('Industry', 'N/A')}")
                 with info_col2:
-                    st.write(f"**Cluster:** {company_data['Cluster'].iloc[0]}")
+                    st.write(f"**Cluster:** {latest['Cluster']}")
                     st.write(f"**Years of Data:** {company_data['Year'].nunique()}")
-                    st.write(f"**Latest Year:** {company_data['Year'].max().strftime('%Y')}")
+                    st.write(f"**Latest Year:** {company_data['Year_Display'].max()}")
                 
                 st.divider()
                 
                 # Key metrics
                 st.subheader("Key Financial Metrics")
-                latest = company_data.iloc[-1] if len(company_data) > 0 else company_data.iloc[0]
-                
-                metrics_col1, metrics_col2, metrics_col3, metrics_col4 = st.columns(4)
-                with metrics_col1:
-                    if 'ROA' in latest:
-                        st.metric("ROA", f"{latest['ROA']:.2%}")
-                    if 'ROE' in latest:
-                        st.metric("ROE", f"{latest['ROE']:.2%}")
                 
-                with metrics_col2:
-                    if 'Gross_Margin' in latest:
-                        st.metric("Gross Margin", f"{latest['Gross_Margin']:.2%}")
-                    if 'Net_Margin' in latest:
-                        st.metric("Net Margin", f"{latest['Net_Margin']:.2%}")
-                
-                with metrics_col3:
-                    if 'EBITDA_Margin' in latest:
-                        st.metric("EBITDA Margin", f"{latest['EBITDA_Margin']:.2%}")
-                    if 'Asset_Turnover' in latest:
-                        st.metric("Asset Turnover", f"{latest['Asset_Turnover']:.2f}")
-                
-                with metrics_col4:
-                    if 'Debt_to_Equity' in latest:
-                        st.metric("Debt/Equity", f"{latest['Debt_to_Equity']:.2f}")
-                    if 'Current_Ratio' in latest:
-                        st.metric("Current Ratio", f"{latest['Current_Ratio']:.2f}")
+                # One table render instead of a widget per metric
+                key_metrics = {
+                    label: fmt.format(latest[col])
+                    for label, col, fmt in KEY_METRICS if col in latest
+                }
+                st.dataframe(pd.DataFrame([key_metrics]), use_container_width=True, hide_index=True)
                 
                 # Show company data
                 st.subheader("Historical Data")
-                st.dataframe(company_data.sort_values('Year', ascending=False), use_container_width=True)
+                # Rows are already chronological, so newest first is a reversed view
+                st.dataframe(company_data.iloc[::-1], use_container_width=True)
     
     with tab2:
         st.header("Sector Analysis")
-        sector_data = df[df['Sector'] == selected_sector]
+        sector_overview = compute_group_overview(data_version, 'Sector').get(selected_sector)
         
-        if not sector_data.empty:
+        if sector_overview:
             # Sector overview
             st.subheader(f"{selected_sector} Sector Overview")
             
             overview_col1, overview_col2, overview_col3 = st.columns(3)
             with overview_col1:
-                st.metric("Companies", sector_data['Ticker'].nunique())
+                st.metric("Companies", sector_overview['Companies'])
             with overview_col2:
-                st.metric("Total Records", len(sector_data))
+                st.metric("Total Records", sector_overview['Records'])
             with overview_col3:
-                avg_roa = sector_data['ROA'].mean() if 'ROA' in sector_data.columns else 0
-                st.metric("Average ROA", f"{avg_roa:.2%}")
+                st.metric("Average ROA", f"{sector_overview['Avg ROA']:.2%}")
             
             # Top companies
             st.subheader("Top Performing Companies")
-            if 'ROA' in sector_data.columns:
-                top_companies = sector_data.sort_values('ROA', ascending=False).head(10)
-                display_cols = ['Ticker', 'Name', 'ROA', 'ROE', 'Net_Margin', 'Cluster']
-                display_cols = [col for col in display_cols if col in top_companies.columns]
-                st.dataframe(top_companies[display_cols], use_container_width=True)
+            if 'ROA' in df.columns:
+                top_companies = get_top_companies_by_roa(
+                    data_version, 'Sector', selected_sector,
+                    ('Ticker', 'Name', 'ROA', 'ROE', 'Net_Margin', 'Cluster')
+                )
+                st.dataframe(
+                    top_companies,
+                    use_container_width=True,
+                    column_config={col: PERCENT_COLUMN for col in TABLE_PERCENT_COLS}
+                )
     
     with tab3:
         st.header("Cluster Analysis")
-        cluster_data = df[df['Cluster'] == selected_cluster]
+        cluster_overview = compute_group_overview(data_version, 'Cluster').get(selected_cluster)
         
-        if not cluster_data.empty:
+        if cluster_overview:
             # Cluster overview
             st.subheader(f"Cluster {selected_cluster} Overview")
             
             cluster_col1, cluster_col2, cluster_col3, cluster_col4 = st.columns(4)
             with cluster_col1:
-                st.metric("Companies", cluster_data['Ticker'].nunique())
+                st.metric("Companies", cluster_overview['Companies'])
             with cluster_col2:
-                st.metric("Sectors", cluster_data['Sector'].nunique())
+                st.metric("Sectors", cluster_overview['Sectors'])
             with cluster_col3:
-                st.metric("Total Records", len(cluster_data))
+                st.metric("Total Records", cluster_overview['Records'])
             with cluster_col4:
-                avg_roa = cluster_data['ROA'].mean() if 'ROA' in cluster_data.columns else 0
-                st.metric("Average ROA", f"{avg_roa:.2%}")
+                st.metric("Average ROA", f"{cluster_overview['Avg ROA']:.2%}")
             
             # Top companies in cluster
             st.subheader("Top Companies in Cluster")
-            if 'ROA' in cluster_data.columns:
-                top_cluster_companies = cluster_data.sort_values('ROA', ascending=False).head(10)
-                display_cols = ['Ticker', 'Name', 'Sector', 'ROA', 'ROE', 'Net_Margin']
-                display_cols = [col for col in display_cols if col in top_cluster_companies.columns]
-                st.dataframe(top_cluster_companies[display_cols], use_container_width=True)
+            if 'ROA' in df.columns:
+                top_cluster_companies = get_top_companies_by_roa(
+                    data_version, 'Cluster', selected_cluster,
+                    ('Ticker', 'Name', 'Sector', 'ROA', 'ROE', 'Net_Margin')
+                )
+                st.dataframe(
+                    top_cluster_companies,
+                    use_container_width=True,
+                    column_config={col: PERCENT_COLUMN for col in TABLE_PERCENT_COLS}
+                )
     
     with tab4:
         st.header("📈 Visual Analysis")
@@ -194,141 +507,38 @@ if df is not None:
         
         with col_left:
             st.subheader("1. Cluster Distribution")
-            
-            # Count companies per cluster
-            cluster_counts = df['Cluster'].value_counts().reset_index()
-            cluster_counts.columns = ['Cluster', 'Company Count']
-            
-            # Create donut chart
-            fig1 = go.Figure(data=[go.Pie(
-                labels=cluster_counts['Cluster'],
-                values=cluster_counts['Company Count'],
-                hole=0.4,
-                marker=dict(colors=px.colors.qualitative.Set3),
-                textinfo='label+percent',
-                hoverinfo='label+value+percent'
-            )])
-            
-            fig1.update_layout(
-                title_text="Company Distribution by Cluster",
-                title_font_size=16,
-                showlegend=True,
-                height=400
-            )
-            
-            st.plotly_chart(fig1, use_container_width=True)
+            st.plotly_chart(build_cluster_donut(data_version), use_container_width=True)
             
             # Cluster summary table
             st.subheader("Cluster Summary")
-            cluster_stats = df.groupby('Cluster').agg({
-                'ROA': 'mean',
-                'ROE': 'mean',
-                'Ticker': 'nunique'
-            }).round(4).reset_index()
-            
-            # Format percentages
-            cluster_stats['ROA'] = cluster_stats['ROA'].apply(lambda x: f"{x:.2%}")
-            cluster_stats['ROE'] = cluster_stats['ROE'].apply(lambda x: f"{x:.2%}")
-            cluster_stats.columns = ['Cluster', 'Avg ROA', 'Avg ROE', 'Companies']
-            
-            st.dataframe(cluster_stats, use_container_width=True, hide_index=True)
+            st.dataframe(
+                compute_visual_aggregates(data_version)['cluster_stats'],
+                use_container_width=True,
+                hide_index=True,
+                column_config={'Avg ROA': PERCENT_COLUMN, 'Avg ROE': PERCENT_COLUMN}
+            )
         
         with col_right:
             st.subheader("2. Sector Performance")
-            
-            # Average ROA by sector
-            sector_roa = df.groupby('Sector')['ROA'].mean().reset_index()
-            sector_roa = sector_roa.sort_values('ROA', ascending=True)
-            
-            fig2 = px.bar(
-                sector_roa,
-                y='Sector',
-                x='ROA',
-                title='Average ROA by Sector',
-                orientation='h',
-                color='ROA',
-                color_continuous_scale='Blues',
-                text_auto='.2%'
-            )
-            
-            fig2.update_layout(
-                height=400,
-                xaxis_title="Average ROA",
-                yaxis_title="Sector",
-                yaxis={'categoryorder': 'total ascending'}
-            )
-            
-            st.plotly_chart(fig2, use_container_width=True)
+            st.plotly_chart(build_sector_roa_bar(data_version), use_container_width=True)
             
             # Top sectors by company count
             st.subheader("3. Top Sectors by Company Count")
-            
-            sector_counts = df['Sector'].value_counts().reset_index()
-            sector_counts.columns = ['Sector', 'Company Count']
-            sector_counts = sector_counts.head(8)  # Top 8 sectors
-            
-            fig3 = px.bar(
-                sector_counts,
-                x='Sector',
-                y='Company Count',
-                title='Number of Companies per Sector',
-                color='Company Count',
-                color_continuous_scale='Viridis',
-                text_auto=True
-            )
-            
-            fig3.update_layout(
-                height=400,
-                xaxis_title="Sector",
-                yaxis_title="Number of Companies",
-                xaxis_tickangle=45
-            )
-            
-            st.plotly_chart(fig3, use_container_width=True)
+            st.plotly_chart(build_sector_count_bar(data_version), use_container_width=True)
         
         # Bottom section - Single line chart
         st.subheader("4. Top 5 Companies by ROA")
         
-        # Get top 5 companies by average ROA
-        company_avg_roa = df.groupby(['Ticker', 'Name']).agg({
-            'ROA': 'mean',
-            'Sector': 'first',
-            'Cluster': 'first'
-        }).reset_index()
-        
-        top_companies = company_avg_roa.nlargest(5, 'ROA')
-        
-        # Get historical data for these companies
-        top_tickers = top_companies['Ticker'].tolist()
-        top_data = df[df['Ticker'].isin(top_tickers)]
-        
-        if len(top_data) > 0:
-            fig4 = px.line(
-                top_data,
-                x='Year_Display',
-                y='ROA',
-                color='Name',
-                markers=True,
-                title='ROA Trend for Top 5 Companies',
-                line_shape='linear'
-            )
-            
-            fig4.update_layout(
-                height=400,
-                xaxis_title="Year",
-                yaxis_title="ROA",
-                yaxis_tickformat=".0%",
-                hovermode='x unified'
-            )
-            
-            st.plotly_chart(fig4, use_container_width=True)
+        if not compute_top_companies(data_version, 5).empty:
+            st.plotly_chart(build_top_roa_line(data_version, 5), use_container_width=True)
             
             # Show top companies table
-            top_companies_display = top_companies[['Ticker', 'Name', 'Sector', 'Cluster', 'ROA']]
-            top_companies_display['ROA'] = top_companies_display['ROA'].apply(lambda x: f"{x:.2%}")
-            top_companies_display.columns = ['Ticker', 'Company Name', 'Sector', 'Cluster', 'Average ROA']
-            
-            st.dataframe(top_companies_display, use_container_width=True, hide_index=True)
+            st.dataframe(
+                compute_top_companies_table(data_version, 5),
+                use_container_width=True,
+                hide_index=True,
+                column_config={'Average ROA': PERCENT_COLUMN}
+            )
     
     # Info in sidebar
     st.sidebar.divider()
@@ -342,13 +552,7 @@ if df is not None:
     
     # Download option
     st.sidebar.divider()
-    if st.sidebar.button("📥 Download Dataset"):
-        csv = df.to_csv(index=False)
-        st.sidebar.download_button(
-            label="Click to Download",
-            data=csv,
-            file_name="financial_data.csv",
-            mime="text/csv"
-        )
+    with st.sidebar:
+        render_download(data_version)
 else:
     st.error("Could not load data. Please check the CSV file.")